@@ -0,0 +1,257 @@
+"""
+Fetching and HTML-to-text helpers shared by the law scrapers
+(scrape_nii_law.py and scrape_old_law_nevo.py).
+
+Both scrapers request some of the same nevo.co.il pages. Routing their
+requests through this module gives them one on-disk HTTP cache, one set of
+per-host limits and one in-process memo, so a URL is downloaded and parsed
+at most once per process.
+"""
+
+import codecs
+import re
+import threading
+from pathlib import Path
+from urllib.parse import urlsplit
+
+try:
+    import requests
+    # "gzip,deflate", plus br/zstd when urllib3 finds brotli/zstandard installed
+    from urllib3.util.request import ACCEPT_ENCODING
+    HAS_REQUESTS = True
+except ImportError:
+    ACCEPT_ENCODING = 'gzip, deflate'
+    HAS_REQUESTS = False
+
+try:
+    from bs4 import BeautifulSoup
+    from bs4.dammit import EncodingDetector
+    HAS_BS4 = True
+except ImportError:
+    HAS_BS4 = False
+
+# Optional on-disk HTTP cache so re-runs don't re-download unchanged pages
+try:
+    import requests_cache
+    HAS_REQUESTS_CACHE = True
+except ImportError:
+    HAS_REQUESTS_CACHE = False
+
+# Prefer the C-based lxml parser; fall back to the pure-Python one if missing
+try:
+    from lxml import etree
+    from lxml import html as lxml_html
+    HAS_LXML = True
+    HTML_PARSER = 'lxml'
+except ImportError:
+    HAS_LXML = False
+    HTML_PARSER = 'html.parser'
+
+
+DATA_DIR = Path(__file__).parent.parent / "data"
+
+HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36',
+    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
+    'Accept-Language': 'he-IL,he;q=0.9,en-US;q=0.8,en;q=0.7',
+    'Accept-Encoding': ACCEPT_ENCODING,
+}
+
+MAX_PER_HOST = 2     # concurrent fetches against any single host (be polite)
+
+# Ignored by git; delete it to force fresh downloads
+HTTP_CACHE_FILE = DATA_DIR / '.http_cache.sqlite'
+HTTP_CACHE_TTL = 86400  # seconds before a cached page is revalidated
+
+_thread_local = threading.local()
+_http_cache = None  # SQLite backend shared by all sessions, created on first use
+_http_cache_lock = threading.Lock()
+_host_semaphores = {}
+_host_semaphores_lock = threading.Lock()
+
+# In-process memo of responses by URL; each URL has its own lock so that
+# concurrent callers asking for the same page wait for a single download
+_FETCH_CACHE = {}
+_fetch_locks = {}
+_fetch_locks_lock = threading.Lock()
+
+
+def new_session():
+    """Create a session, backed by the on-disk HTTP cache when requests_cache is installed."""
+    global _http_cache
+    if not HAS_REQUESTS_CACHE:
+        return requests.Session()
+    with _http_cache_lock:
+        if _http_cache is None:
+            DATA_DIR.mkdir(parents=True, exist_ok=True)
+            _http_cache = requests_cache.SQLiteCache(HTTP_CACHE_FILE)
+    return requests_cache.CachedSession(
+        backend=_http_cache,
+        expire_after=HTTP_CACHE_TTL,
+        allowable_codes=(200,),
+        stale_if_error=True,
+    )
+
+
+def configure_session(session):
+    """Apply the shared headers and connection pool settings to session."""
+    session.headers.update(HEADERS)
+    adapter = requests.adapters.HTTPAdapter(pool_connections=8, pool_maxsize=8)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+
+def get_session():
+    """Return a requests.Session owned by the calling worker thread."""
+    session = getattr(_thread_local, "session", None)
+    if session is None:
+        session = _thread_local.session = configure_session(new_session())
+    return session
+
+
+def get_download_session():
+    """Return an uncached requests.Session owned by the calling worker thread.
+
+    requests_cache reads and stores the whole body of every response, which
+    defeats streaming, so large downloads go through a plain session.
+    """
+    session = getattr(_thread_local, "download_session", None)
+    if session is None:
+        session = _thread_local.download_session = configure_session(requests.Session())
+    return session
+
+
+def host_semaphore(url):
+    """Return the semaphore limiting concurrent requests to url's host."""
+    host = urlsplit(url).netloc
+    with _host_semaphores_lock:
+        return _host_semaphores.setdefault(host, threading.Semaphore(MAX_PER_HOST))
+
+
+def fetch(url, timeout=30):
+    """GET url and return the response, reusing it if this process already fetched url.
+
+    Network errors propagate to the caller and are not memoized, so a later
+    call retries the request.
+    """
+    with _fetch_locks_lock:
+        url_lock = _fetch_locks.setdefault(url, threading.Lock())
+    with url_lock:
+        resp = _FETCH_CACHE.get(url)
+        if resp is None:
+            with host_semaphore(url):
+                resp = get_session().get(url, timeout=timeout, verify=True)
+            _FETCH_CACHE[url] = resp
+        return resp
+
+
+def download(url, path, timeout=30, chunk_size=65536):
+    """Stream url's body into path in chunks and return the closed response.
+
+    The file is only written for a 200 response; its size is path.stat().st_size.
+    The body goes to a .part file that replaces path once complete, so a failed
+    download never leaves a truncated file at path. The host semaphore is held
+    until the whole body has been read, so MAX_PER_HOST also bounds concurrent
+    downloads. Responses are neither memoized nor stored in the HTTP cache.
+    """
+    with host_semaphore(url):
+        with get_download_session().get(url, timeout=timeout, verify=True, stream=True) as resp:
+            if resp.status_code == 200:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                part_path = path.with_name(path.name + '.part')
+                try:
+                    with open(part_path, 'wb') as f:
+                        for chunk in resp.iter_content(chunk_size):
+                            f.write(chunk)
+                except BaseException:
+                    part_path.unlink(missing_ok=True)
+                    raise
+                part_path.replace(path)
+    return resp
+
+
+def response_charset(resp):
+    """Return the charset named in resp's Content-Type header, or None.
+
+    Unlike requests.utils.get_encoding_from_headers alone, a text/* response
+    without a charset yields None rather than ISO-8859-1, so the parser still
+    falls back to the page's <meta> declaration. Unknown charsets yield None.
+    """
+    if 'charset' not in resp.headers.get('Content-Type', '').lower():
+        return None
+    encoding = requests.utils.get_encoding_from_headers(resp.headers)
+    try:
+        codecs.lookup(encoding)
+    except (LookupError, TypeError):
+        return None
+    return encoding
+
+
+def extract_text_from_html(html, encoding=None):
+    """Extract clean text from HTML (bytes or str), preserving structure.
+
+    encoding is the charset from the HTTP header (see response_charset); it
+    takes precedence over any <meta> declaration. Without it, the charset of
+    a bytes body comes from its BOM or <meta> tag, defaulting to UTF-8.
+    """
+    if not html:
+        return ""
+
+    if isinstance(html, str):
+        encoding = None  # already decoded
+
+    if not HAS_BS4:
+        return html.decode(encoding or 'utf-8', errors='replace') if isinstance(html, bytes) else html
+
+    if HAS_LXML:
+        return _extract_text_lxml(html, encoding)
+
+    soup = BeautifulSoup(html, HTML_PARSER, from_encoding=encoding)
+
+    # Remove script and style elements
+    for script in soup(["script", "style", "meta", "link"]):
+        script.decompose()
+
+    # Get text with newlines preserved
+    text = soup.get_text(separator='\n', strip=True)
+
+    # Clean up excessive whitespace
+    return re.sub(r'\n{3,}', '\n\n', text)
+
+
+def sniff_charset(html):
+    """Return (body without BOM, charset) from a bytes body's BOM or <meta> tag.
+
+    Falls back to UTF-8, as libxml2 would otherwise guess Latin-1 for a page
+    that declares nothing. Unknown declared charsets also fall back to UTF-8.
+    """
+    html, encoding = EncodingDetector.strip_byte_order_mark(html)
+    encoding = encoding or EncodingDetector.find_declared_encoding(html, is_html=True)
+    try:
+        codecs.lookup(encoding)
+    except (LookupError, TypeError):
+        encoding = 'utf-8'
+    return html, encoding
+
+
+def _extract_text_lxml(html, encoding=None):
+    """lxml fast path for extract_text_from_html: one C-level strip, one text walk."""
+    parser = None
+    if isinstance(html, bytes) and not encoding:
+        html, encoding = sniff_charset(html)
+    if encoding:
+        # Transcode with Python's codec so libxml2 gets a charset it always knows
+        html = html.decode(encoding, errors='replace').encode('utf-8')
+        parser = lxml_html.HTMLParser(encoding='utf-8')
+    try:
+        tree = lxml_html.document_fromstring(html, parser=parser)
+    except etree.ParserError:  # empty or whitespace-only document
+        return ""
+
+    # Drop script/style/etc. but keep the text that follows them
+    # (<template> content is excluded to match BeautifulSoup's get_text)
+    etree.strip_elements(tree, 'script', 'style', 'meta', 'link', 'template', with_tail=False)
+
+    # Skipping blank strings leaves no empty lines, so no whitespace cleanup is needed
+    return '\n'.join(t for t in (s.strip() for s in tree.itertext()) if t)
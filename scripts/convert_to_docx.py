@@ -3,6 +3,8 @@
 Convert Hebrew markdown research paper to Word (.docx) with proper RTL formatting.
 """
 
+import copy
+import os
 import re
 from docx import Document
 from docx.shared import Pt, Inches, RGBColor
@@ -10,86 +12,130 @@ from docx.enum.text import WD_ALIGN_PARAGRAPH, WD_PARAGRAPH_ALIGNMENT
 from docx.oxml.ns import qn
 from docx.oxml import OxmlElement
 
+# Base document with styles and margins already configured (see build_template)
+TEMPLATE_FILE = os.path.normpath(os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'reports', '_template.docx'))
+
+# Markdown patterns, compiled once at import time
+_BOLD_ITALIC_RE = re.compile(r'(\*\*(.+?)\*\*|\*(.+?)\*)')
+_FOOTNOTE_DEF_RE = re.compile(r'^\[\^(\d+)\]:\s*(.+)$')
+_FOOTNOTE_REF_RE = re.compile(r'\[\^(\d+)\]')
+_BULLET_RE = re.compile(r'^[\-\*]\s+')
+
+# Non-digit, non-space characters that can open a block element in _LINE_RE
+_BLOCK_MARKER_CHARS = frozenset('#>-*')
+
+# Block-level line classifier; alternatives are listed in precedence order
+# and match.lastgroup names the one that fired
+_LINE_RE = re.compile(
+    r'(?P<rule>\s*---)$'
+    r'|(?P<heading>#{1,3})'
+    r'|(?P<blockquote>>)'
+    r'|(?P<numbered>\d+\.\s+(?P<item>.+))$'
+    r'|(?P<bullet>\s*[\-\*])'
+)
+
+# <w:bidi w:val="1"/> is identical for every paragraph, so build it once and copy it
+_BIDI_TEMPLATE = OxmlElement('w:bidi')
+_BIDI_TEMPLATE.set(qn('w:val'), '1')
+
+# <w:jc w:val="right"/> used for table cell paragraphs
+_JC_RIGHT_TEMPLATE = OxmlElement('w:jc')
+_JC_RIGHT_TEMPLATE.set(qn('w:val'), 'right')
+
 def set_rtl(paragraph):
     """Set paragraph to RTL (Right-to-Left) direction."""
     pPr = paragraph._element.get_or_add_pPr()
-    bidi = OxmlElement('w:bidi')
-    bidi.set(qn('w:val'), '1')
-    pPr.append(bidi)
-
-def parse_markdown_line(line):
-    """Parse a single line for inline formatting."""
-    # Store the original line for processing
-    segments = []
+    pPr.append(copy.deepcopy(_BIDI_TEMPLATE))
+
+def iter_segments(line):
+    """Yield (format_type, content) segments for a line's inline formatting."""
+    # Fast path: most lines carry no emphasis markers at all
+    if '*' not in line:
+        yield ('normal', line)
+        return
+
     current_pos = 0
 
     # Find all bold (**text**) and italic (*text*) markers
-    # Pattern: **bold** or *italic*
-    pattern = r'(\*\*(.+?)\*\*|\*(.+?)\*)'
-
-    for match in re.finditer(pattern, line):
-        # Add text before the match
+    for match in _BOLD_ITALIC_RE.finditer(line):
+        # Yield text before the match
         if match.start() > current_pos:
-            segments.append(('normal', line[current_pos:match.start()]))
+            yield ('normal', line[current_pos:match.start()])
 
-        # Add the formatted text
+        # Yield the formatted text
         if match.group(2):  # Bold
-            segments.append(('bold', match.group(2)))
+            yield ('bold', match.group(2))
         elif match.group(3):  # Italic
-            segments.append(('italic', match.group(3)))
+            yield ('italic', match.group(3))
 
         current_pos = match.end()
 
-    # Add remaining text
-    if current_pos < len(line):
-        segments.append(('normal', line[current_pos:]))
-
-    # If no formatting found, return the whole line as normal
-    if not segments:
-        segments.append(('normal', line))
-
-    return segments
+    # Yield remaining text; an empty line still produces one empty segment
+    if current_pos < len(line) or not line:
+        yield ('normal', line[current_pos:])
+
+def build_run(content, format_type='normal'):
+    """Build a <w:r> element for a text segment, mirroring Paragraph.add_run."""
+    run = OxmlElement('w:r')
+    if format_type in ('bold', 'italic'):
+        rPr = OxmlElement('w:rPr')
+        rPr.append(OxmlElement('w:b' if format_type == 'bold' else 'w:i'))
+        run.append(rPr)
+    if content:
+        # CT_R.text turns \t into <w:tab/> and \n/\r into <w:br/>, and sets
+        # xml:space on the <w:t> pieces, exactly as Paragraph.add_run does
+        run.text = content
+    return run
 
 def add_formatted_paragraph(doc, text, style='Normal'):
     """Add a paragraph with RTL and inline formatting."""
     paragraph = doc.add_paragraph(style=style)
     set_rtl(paragraph)
 
-    segments = parse_markdown_line(text)
-    for format_type, content in segments:
-        run = paragraph.add_run(content)
-        if format_type == 'bold':
-            run.bold = True
-        elif format_type == 'italic':
-            run.italic = True
+    # Build all runs first and attach them to the paragraph in one call
+    paragraph._p.extend(build_run(content, format_type) for format_type, content in iter_segments(text))
 
     return paragraph
 
+def split_table_row(line):
+    """Split a markdown table row into its non-empty, stripped cells."""
+    return [cell for cell in (part.strip() for part in line.split('|')) if cell]
+
 def parse_table(lines, start_idx):
     """Parse a markdown table starting at start_idx."""
     table_lines = []
     idx = start_idx
 
-    while idx < len(lines) and '|' in lines[idx]:
-        table_lines.append(lines[idx])
+    while idx < len(lines):
+        line = lines[idx]
+        if '|' not in line:
+            break
+        table_lines.append(line)
         idx += 1
 
     if len(table_lines) < 2:
         return None, start_idx
 
     # Parse header
-    header_line = table_lines[0]
-    headers = [cell.strip() for cell in header_line.split('|') if cell.strip()]
+    headers = split_table_row(table_lines[0])
 
     # Skip separator line
     rows = []
     for line in table_lines[2:]:
-        cells = [cell.strip() for cell in line.split('|') if cell.strip()]
+        cells = split_table_row(line)
         if cells:
             rows.append(cells)
 
     return {'headers': headers, 'rows': rows}, idx
 
+def fill_cell(tc, text, format_type='normal'):
+    """Write right-aligned RTL text into the first paragraph of a <w:tc> element."""
+    p = tc.find(qn('w:p'))
+    pPr = p.get_or_add_pPr()
+    pPr.append(copy.deepcopy(_BIDI_TEMPLATE))
+    pPr.append(copy.deepcopy(_JC_RIGHT_TEMPLATE))
+    p.append(build_run(text, format_type))
+
 def add_table_to_doc(doc, table_data):
     """Add a table to the document."""
     if not table_data:
@@ -102,36 +148,17 @@ def add_table_to_doc(doc, table_data):
     table = doc.add_table(rows=1 + len(rows), cols=len(headers))
     table.style = 'Light Grid Accent 1'
 
-    # Add headers
-    header_cells = table.rows[0].cells
-    for idx, header in enumerate(headers):
-        cell = header_cells[idx]
-        paragraph = cell.paragraphs[0]
-        set_rtl(paragraph)
-        paragraph.text = header
-        paragraph.alignment = WD_ALIGN_PARAGRAPH.RIGHT
-        run = paragraph.runs[0]
-        run.bold = True
-
-    # Add rows
-    for row_idx, row_data in enumerate(rows):
-        row_cells = table.rows[row_idx + 1].cells
-        for col_idx, cell_data in enumerate(row_data):
-            if col_idx < len(row_cells):
-                cell = row_cells[col_idx]
-                paragraph = cell.paragraphs[0]
-                set_rtl(paragraph)
-                paragraph.text = cell_data
-                paragraph.alignment = WD_ALIGN_PARAGRAPH.RIGHT
+    # Fill cells directly on the <w:tbl> element rather than through cell wrappers
+    header_tr, *row_trs = table._tbl.tr_lst
+    for tc, header in zip(header_tr.tc_lst, headers):
+        fill_cell(tc, header, 'bold')
 
-def convert_markdown_to_docx(input_file, output_file):
-    """Convert markdown file to docx with RTL formatting."""
+    for tr, row_data in zip(row_trs, rows):
+        for tc, cell_data in zip(tr.tc_lst, row_data):
+            fill_cell(tc, cell_data)
 
-    # Read the markdown file
-    with open(input_file, 'r', encoding='utf-8') as f:
-        content = f.read()
-
-    # Create document
+def build_template(template_file=TEMPLATE_FILE):
+    """Create the base .docx with the David font, heading sizes and margins preset."""
     doc = Document()
 
     # Set up styles
@@ -166,6 +193,22 @@ def convert_markdown_to_docx(input_file, output_file):
         section.left_margin = Inches(1)
         section.right_margin = Inches(1)
 
+    doc.save(template_file)
+    print(f"Template saved to: {template_file}")
+
+def convert_markdown_to_docx(input_file, output_file):
+    """Convert markdown file to docx with RTL formatting."""
+
+    # Read the markdown file as a list of lines (no separate full-text copy);
+    # trailing newlines are dropped by the rstrip/strip calls below
+    with open(input_file, 'r', encoding='utf-8') as f:
+        lines = f.readlines()
+
+    # Create document from the pre-styled template
+    if not os.path.exists(TEMPLATE_FILE):
+        build_template()
+    doc = Document(TEMPLATE_FILE)
+
     # Add title page
     title = doc.add_paragraph()
     set_rtl(title)
@@ -177,20 +220,18 @@ def convert_markdown_to_docx(input_file, output_file):
 
     doc.add_page_break()
 
-    # Split content into lines
-    lines = content.split('\n')
-
-    # Collect footnotes
+    # Collect footnotes, remembering which lines define them
     footnotes = {}
-    footnote_pattern = r'^\[\^(\d+)\]:\s*(.+)$'
+    fn_lines = {}
 
     # First pass: collect footnotes
-    for line in lines:
-        footnote_match = re.match(footnote_pattern, line.strip())
+    for idx, line in enumerate(lines):
+        footnote_match = _FOOTNOTE_DEF_RE.match(line.strip())
         if footnote_match:
             footnote_num = footnote_match.group(1)
             footnote_text = footnote_match.group(2)
             footnotes[footnote_num] = footnote_text
+            fn_lines[idx] = (footnote_num, footnote_text)
 
     # Second pass: process content
     i = 0
@@ -206,36 +247,38 @@ def convert_markdown_to_docx(input_file, output_file):
             continue
 
         # Skip footnote definitions
-        if re.match(footnote_pattern, line.strip()):
+        if i in fn_lines:
             i += 1
             continue
 
+        stripped = line.lstrip()
+
+        # Classify the line with a single regex match; plain prose cannot
+        # start a block element, so the first character decides whether to try
+        first = line[0]
+        if first in _BLOCK_MARKER_CHARS or first.isdecimal() or first.isspace():
+            line_match = _LINE_RE.match(line)
+        else:
+            line_match = None
+        kind = line_match.lastgroup if line_match else None
+
         # Skip separator lines
-        if line.strip() == '---':
+        if kind == 'rule':
             doc.add_paragraph()
             i += 1
             continue
 
         # Handle headings
-        if line.startswith('###'):
-            text = line.replace('###', '').strip()
-            add_formatted_paragraph(doc, text, 'Heading 3')
-            i += 1
-            continue
-        elif line.startswith('##'):
-            text = line.replace('##', '').strip()
-            add_formatted_paragraph(doc, text, 'Heading 2')
-            i += 1
-            continue
-        elif line.startswith('#'):
-            text = line.replace('#', '').strip()
-            add_formatted_paragraph(doc, text, 'Heading 1')
+        if kind == 'heading':
+            marker = line_match.group('heading')
+            text = line[len(marker):].strip()
+            add_formatted_paragraph(doc, text, f'Heading {len(marker)}')
             i += 1
             continue
 
         # Handle blockquotes
-        if line.startswith('>'):
-            text = line.replace('>', '').strip()
+        if kind == 'blockquote':
+            text = line[1:].strip()
             paragraph = add_formatted_paragraph(doc, text, 'Normal')
             paragraph.paragraph_format.left_indent = Inches(0.5)
             paragraph.paragraph_format.right_indent = Inches(0.5)
@@ -251,28 +294,26 @@ def convert_markdown_to_docx(input_file, output_file):
                 continue
 
         # Handle numbered lists
-        numbered_list_match = re.match(r'^(\d+)\.\s+(.+)$', line)
-        if numbered_list_match:
-            text = numbered_list_match.group(2)
+        if kind == 'numbered':
+            text = line_match.group('item')
             # Replace inline footnote references
-            text = re.sub(r'\[\^(\d+)\]', r'[\1]', text)
+            text = _FOOTNOTE_REF_RE.sub(r'[\1]', text)
             paragraph = add_formatted_paragraph(doc, text, 'List Number')
             i += 1
             continue
 
         # Handle bullet points
-        if line.strip().startswith('-') or line.strip().startswith('*'):
-            text = re.sub(r'^[\-\*]\s+', '', line.strip())
+        if kind == 'bullet':
+            text = _BULLET_RE.sub('', stripped)
             # Replace inline footnote references
-            text = re.sub(r'\[\^(\d+)\]', r'[\1]', text)
+            text = _FOOTNOTE_REF_RE.sub(r'[\1]', text)
             paragraph = add_formatted_paragraph(doc, text, 'List Bullet')
             i += 1
             continue
 
         # Handle normal paragraphs
-        text = line.strip()
         # Replace inline footnote references
-        text = re.sub(r'\[\^(\d+)\]', r'[\1]', text)
+        text = _FOOTNOTE_REF_RE.sub(r'[\1]', stripped)
         add_formatted_paragraph(doc, text, 'Normal')
         i += 1
 
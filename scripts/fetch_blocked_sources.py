@@ -4,9 +4,10 @@ Fetch sources that were blocked for Claude's WebFetch tool.
 Saves raw text + metadata (including original URL) to JSON files.
 """
 
-import json
 import os
 import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
@@ -17,6 +18,9 @@ except ImportError:
     os.system(f"{sys.executable} -m pip install requests")
     import requests
 
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
 try:
     from bs4 import BeautifulSoup
 except ImportError:
@@ -24,9 +28,47 @@ except ImportError:
     os.system(f"{sys.executable} -m pip install beautifulsoup4")
     from bs4 import BeautifulSoup
 
+import soupsieve  # installed with beautifulsoup4
+
+try:
+    import orjson
+except ImportError:
+    print("Installing orjson...")
+    os.system(f"{sys.executable} -m pip install orjson")
+    import orjson
+
+try:
+    import lxml  # noqa: F401  (BeautifulSoup parser backend)
+except ImportError:
+    print("Installing lxml...")
+    os.system(f"{sys.executable} -m pip install lxml")
+    import lxml  # noqa: F401
+
 DATA_DIR = Path("/Users/zvishalem/Downloads/bituach_leumi_research/data/raw_fetches")
 DATA_DIR.mkdir(parents=True, exist_ok=True)
 
+# Boilerplate elements dropped before text extraction
+STRIP_SELECTOR = soupsieve.compile("script, style, nav, footer, header")
+
+# Main content containers, in order of preference
+MAIN_CONTENT_SELECTORS = [
+    soupsieve.compile(selector)
+    for selector in (
+        "div#mw-content-text",  # Wikipedia/Wikisource
+        "div.mw-parser-output",
+        "article",
+        "main",
+        "div#content",
+        "div.content",
+    )
+]
+
+# Extracted text is capped at this many characters per source
+MAX_TEXT_CHARS = 50000
+
+# Fewer workers than sources, so threads (and their sessions) serve several fetches
+MAX_WORKERS = 4
+
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
     "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
@@ -82,31 +124,69 @@ SOURCES = [
 ]
 
 
+_thread_local = threading.local()
+
+
+def get_session():
+    """Return a requests.Session owned by the calling worker thread.
+
+    Sessions keep connections alive between fetches and retry transient
+    gateway errors. They are not safe to share, so each thread gets its own.
+    """
+    session = getattr(_thread_local, "session", None)
+    if session is None:
+        session = requests.Session()
+        session.headers.update(HEADERS)
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=16,
+            max_retries=Retry(
+                total=2,
+                backoff_factor=0.3,
+                status_forcelist=[502, 503, 504],
+                raise_on_status=False,  # hand back the last response instead of raising
+            ),
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        _thread_local.session = session
+    return session
+
+
+def store_text(result, text):
+    """Store extracted text in result, capped at MAX_TEXT_CHARS."""
+    result["extracted_text"] = text[:MAX_TEXT_CHARS]
+    result["truncated"] = len(text) > MAX_TEXT_CHARS
+    result["full_length"] = len(text)
+
+
 def fetch_and_save(source):
-    """Fetch a URL and save raw text + metadata to JSON."""
+    """Fetch a URL and save raw text + metadata to JSON.
+
+    Runs on worker threads, so nothing is printed here; returns the result
+    and a one-line outcome for main() to report in source order.
+    """
     source_id = source["id"]
     url = source["url"]
     description = source["description"]
 
-    print(f"\n{'='*60}")
-    print(f"Fetching: {source_id}")
-    print(f"URL: {url}")
-
     result = {
         "id": source_id,
         "url": url,
         "description": description,
-        "fetch_timestamp": datetime.now().isoformat(),
+        "fetch_timestamp": datetime.now(),
         "success": False,
         "status_code": None,
         "content_type": None,
-        "raw_text": None,
         "extracted_text": None,
+        "truncated": False,
+        "full_length": None,
         "error": None,
     }
 
     try:
-        resp = requests.get(url, headers=HEADERS, timeout=30, allow_redirects=True)
+        # Stream so PDF bodies go straight to disk instead of being buffered
+        resp = get_session().get(url, timeout=30, allow_redirects=True, stream=True)
         result["status_code"] = resp.status_code
         result["content_type"] = resp.headers.get("Content-Type", "")
         result["final_url"] = resp.url
@@ -115,57 +195,63 @@ def fetch_and_save(source):
             if "pdf" in result["content_type"].lower():
                 # Save PDF binary separately
                 pdf_path = DATA_DIR / f"{source_id}.pdf"
-                pdf_path.write_bytes(resp.content)
-                result["raw_text"] = f"[PDF saved to {pdf_path}]"
+                # Write to a .part file so a failed download leaves no truncated PDF
+                part_path = pdf_path.with_name(pdf_path.name + ".part")
+                pdf_size = 0
+                try:
+                    with open(part_path, "wb") as f:
+                        for chunk in resp.iter_content(65536):
+                            f.write(chunk)
+                            pdf_size += len(chunk)
+                except BaseException:
+                    part_path.unlink(missing_ok=True)
+                    raise
+                part_path.replace(pdf_path)
+                result["pdf_path"] = str(pdf_path)
                 result["success"] = True
-                print(f"  -> PDF saved ({len(resp.content)} bytes)")
+                outcome = f"PDF saved ({pdf_size} bytes)"
             else:
                 # Parse HTML
                 resp.encoding = resp.apparent_encoding or "utf-8"
                 html = resp.text
+                resp.close()
                 result["raw_html_length"] = len(html)
 
-                soup = BeautifulSoup(html, "html.parser")
+                soup = BeautifulSoup(html, "lxml")
 
                 # Remove script/style tags
-                for tag in soup(["script", "style", "nav", "footer", "header"]):
+                for tag in STRIP_SELECTOR.select(soup):
                     tag.decompose()
 
                 # Try to find main content
-                main = (
-                    soup.find("div", {"id": "mw-content-text"})  # Wikipedia/Wikisource
-                    or soup.find("div", {"class": "mw-parser-output"})
-                    or soup.find("article")
-                    or soup.find("main")
-                    or soup.find("div", {"id": "content"})
-                    or soup.find("div", {"class": "content"})
-                    or soup.body
+                main = next(
+                    (el for el in (sel.select_one(soup) for sel in MAIN_CONTENT_SELECTORS) if el),
+                    soup.body,
                 )
 
                 if main:
                     text = main.get_text(separator="\n", strip=True)
-                    result["extracted_text"] = text
-                    result["raw_text"] = text[:50000]  # cap at 50k chars
+                    store_text(result, text)
                     result["success"] = True
-                    print(f"  -> OK! Extracted {len(text)} chars")
+                    outcome = f"OK! Extracted {len(text)} chars"
                 else:
-                    result["raw_text"] = soup.get_text(separator="\n", strip=True)[:50000]
+                    store_text(result, soup.get_text(separator="\n", strip=True))
                     result["success"] = True
-                    print(f"  -> OK (no main content found, used full page)")
+                    outcome = "OK (no main content found, used full page)"
         else:
+            resp.close()
             result["error"] = f"HTTP {resp.status_code}"
-            print(f"  -> FAILED: HTTP {resp.status_code}")
+            outcome = f"FAILED: HTTP {resp.status_code}"
 
     except Exception as e:
         result["error"] = str(e)
-        print(f"  -> ERROR: {e}")
+        outcome = f"ERROR: {e}"
 
     # Save to JSON
     out_path = DATA_DIR / f"{source_id}.json"
-    with open(out_path, "w", encoding="utf-8") as f:
-        json.dump(result, f, ensure_ascii=False, indent=2)
+    out_path.write_bytes(orjson.dumps(result, option=orjson.OPT_INDENT_2))
 
-    return result
+    return result, outcome
 
 
 def main():
@@ -175,28 +261,36 @@ def main():
     print(f"Sources to fetch: {len(SOURCES)}")
     print("=" * 60)
 
+    # Fetches are network-bound and each writes its own file, so run them
+    # concurrently, then report them in their listed order
+    with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+        fetched = list(executor.map(fetch_and_save, SOURCES))
+
     results_summary = []
-    for source in SOURCES:
-        result = fetch_and_save(source)
+    for source, (result, outcome) in zip(SOURCES, fetched):
+        print(f"\n{'='*60}")
+        print(f"Fetching: {source['id']}")
+        print(f"URL: {source['url']}")
+        print(f"  -> {outcome}")
+
         results_summary.append({
             "id": source["id"],
             "url": source["url"],
             "success": result["success"],
             "status_code": result["status_code"],
-            "text_length": len(result.get("extracted_text") or result.get("raw_text") or ""),
+            "text_length": result.get("full_length") or 0,
             "error": result.get("error"),
         })
 
     # Save summary
     summary_path = DATA_DIR / "_fetch_summary.json"
-    with open(summary_path, "w", encoding="utf-8") as f:
-        json.dump({
-            "timestamp": datetime.now().isoformat(),
-            "total": len(SOURCES),
-            "successful": sum(1 for r in results_summary if r["success"]),
-            "failed": sum(1 for r in results_summary if not r["success"]),
-            "results": results_summary,
-        }, f, ensure_ascii=False, indent=2)
+    summary_path.write_bytes(orjson.dumps({
+        "timestamp": datetime.now(),
+        "total": len(SOURCES),
+        "successful": sum(1 for r in results_summary if r["success"]),
+        "failed": sum(1 for r in results_summary if not r["success"]),
+        "results": results_summary,
+    }, option=orjson.OPT_INDENT_2))
 
     print("\n" + "=" * 60)
     print("SUMMARY:")
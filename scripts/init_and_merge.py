@@ -1,5 +1,12 @@
 #!/usr/bin/env python3
-import os, time, subprocess, sys
+import os, shutil, time, sys
+
+try:
+    import pygit2
+except ImportError:
+    print('Installing pygit2...')
+    os.system(f'{sys.executable} -m pip install pygit2')
+    import pygit2
 
 PROJECT_DIR = '/Users/zvishalem/Downloads/bituach_leumi_research'
 REPORTS_DIR = os.path.join(PROJECT_DIR, 'reports')
@@ -7,6 +14,8 @@ CHAPTERS_1_3 = os.path.join(REPORTS_DIR, 'chapters_1_3.md')
 CHAPTERS_4_5 = os.path.join(REPORTS_DIR, 'chapters_4_5.md')
 CHAPTERS_6_7 = os.path.join(REPORTS_DIR, 'chapters_6_7.md')
 FULL_PAPER = os.path.join(REPORTS_DIR, 'full_paper.md')
+POLL_INTERVAL = 0.5  # seconds between checks for chapters_1_3.md
+WAIT_TIMEOUT = 150   # give up waiting after this many seconds
 
 TITLE_PAGE = u"""# מי מבוטח בביטוח הלאומי?
 ## מחקר משפטי מקיף
@@ -15,54 +24,102 @@ TITLE_PAGE = u"""# מי מבוטח בביטוח הלאומי?
 
 """
 
-def run(cmd, cwd=PROJECT_DIR):
-    print(f'$ {cmd}')
-    result = subprocess.run(cmd, shell=True, cwd=cwd, capture_output=True, text=True)
-    if result.stdout: print(result.stdout)
-    if result.stderr: print(result.stderr)
-    return result.returncode
+# `git status --short` letters for the index (X) and worktree (Y) columns
+INDEX_CODES = [(pygit2.GIT_STATUS_INDEX_NEW, 'A'), (pygit2.GIT_STATUS_INDEX_MODIFIED, 'M'),
+               (pygit2.GIT_STATUS_INDEX_DELETED, 'D'), (pygit2.GIT_STATUS_INDEX_RENAMED, 'R'),
+               (pygit2.GIT_STATUS_INDEX_TYPECHANGE, 'T')]
+WT_CODES = [(pygit2.GIT_STATUS_WT_MODIFIED, 'M'), (pygit2.GIT_STATUS_WT_DELETED, 'D'),
+            (pygit2.GIT_STATUS_WT_RENAMED, 'R'), (pygit2.GIT_STATUS_WT_TYPECHANGE, 'T')]
+
+def status_lines(repo):
+    """Yield `git status --short` lines: tracked changes first, then untracked files."""
+    tracked, untracked = [], []
+    for path, flags in sorted(repo.status().items()):
+        if flags & pygit2.GIT_STATUS_CONFLICTED:
+            tracked.append(f'UU {path}'); continue
+        x = next((c for f, c in INDEX_CODES if flags & f), ' ')
+        y = next((c for f, c in WT_CODES if flags & f), ' ')
+        if x + y != '  ':
+            tracked.append(f'{x}{y} {path}')
+        # A path deleted from the index but still on disk is also untracked
+        if flags & pygit2.GIT_STATUS_WT_NEW:
+            untracked.append(f'?? {path}')
+    # Ignored entries carry no other flags and are left out, as plain `git status` does
+    yield from tracked
+    yield from untracked
+
+def print_status(repo):
+    lines = list(status_lines(repo))
+    if not lines:
+        print('nothing to commit, working tree clean'); return
+    for line in lines:
+        print(line)
 
 def main():
     os.chdir(PROJECT_DIR)
     print('=== Step 1: Initializing git repo ===')
-    rc = run('git init')
-    if rc != 0:
-        print('ERROR: git init failed'); sys.exit(1)
+    try:
+        repo = pygit2.init_repository(PROJECT_DIR)
+    except pygit2.GitError as e:
+        print(f'ERROR: git init failed: {e}'); sys.exit(1)
+    print(f'Git repository at {repo.path}')
 
     print('\n=== Step 2: Waiting for chapters_1_3.md ===')
     found = False
-    for attempt in range(1, 6):
-        if os.path.exists(CHAPTERS_1_3):
-            size = os.path.getsize(CHAPTERS_1_3)
-            print(f'Found chapters_1_3.md ({size} bytes) on attempt {attempt}')
+    start = time.monotonic()
+    print(f'Polling every {POLL_INTERVAL}s for up to {WAIT_TIMEOUT}s...')
+    while True:
+        size = os.path.getsize(CHAPTERS_1_3) if os.path.exists(CHAPTERS_1_3) else 0
+        if size:
+            print(f'Found chapters_1_3.md ({size} bytes) after {time.monotonic() - start:.1f}s')
             found = True; break
-        print(f'Attempt {attempt}/5: not found. Waiting 30s...')
-        time.sleep(30)
+        if time.monotonic() - start >= WAIT_TIMEOUT: break
+        time.sleep(POLL_INTERVAL)
     if not found:
-        print('WARNING: chapters_1_3.md not found after 5 attempts.')
+        print(f'WARNING: chapters_1_3.md not found after {WAIT_TIMEOUT}s.')
 
     print('\n=== Step 3: Creating full_paper.md ===')
-    parts = [TITLE_PAGE]
-    for path, label in [(CHAPTERS_1_3, 'ch1-3'), (CHAPTERS_4_5, 'ch4-5'), (CHAPTERS_6_7, 'ch6-7')]:
-        if os.path.exists(path):
-            with open(path, 'r', encoding='utf-8') as f: content = f.read()
-            parts.append(content); parts.append('\n\n')
-            print(f'  Added {label} ({len(content)} chars)')
-        else:
-            print(f'  SKIPPED {label}')
-    with open(FULL_PAPER, 'w', encoding='utf-8') as f: f.write(''.join(parts))
+    # Chapters are already UTF-8, so stream their bytes straight into the output
+    with open(FULL_PAPER, 'wb') as out:
+        out.write(TITLE_PAGE.encode('utf-8'))
+        for path, label in [(CHAPTERS_1_3, 'ch1-3'), (CHAPTERS_4_5, 'ch4-5'), (CHAPTERS_6_7, 'ch6-7')]:
+            if os.path.exists(path):
+                with open(path, 'rb') as f: shutil.copyfileobj(f, out)
+                out.write(b'\n\n')
+                print(f'  Added {label} ({os.path.getsize(path)} bytes)')
+            else:
+                print(f'  SKIPPED {label}')
     print(f'  Created full_paper.md ({os.path.getsize(FULL_PAPER)} bytes)')
 
     print('\n=== Step 5: git add ===')
-    run('git add -A')
+    index = repo.index
+    index.add_all(); index.write()
+    print(f'  Staged {len(index)} files')
 
     print('\n=== Step 6: git commit ===')
     msg = 'Initial commit: NII research paper with website\n\nResearch paper on who is insured by Israel\'s National Insurance (Bituach Leumi).\nIncludes 7 chapters covering old/new law, additional legislation, practice gaps,\ncase law, and meta-legal conclusions. Static website with charts and sources.'
-    run(f'git commit -m "{msg}"')
+    try:
+        sig = repo.default_signature
+    except KeyError:
+        print('ERROR: git user.name/user.email not configured'); sys.exit(1)
+    tree = index.write_tree()
+    if repo.head_is_unborn:
+        parents = []
+        unchanged = not len(index)
+    else:
+        parents = [repo.head.target]
+        unchanged = tree == repo.head.peel(pygit2.Commit).tree.id
+    if unchanged:
+        # Like `git commit`, refuse to record a commit that changes nothing
+        print('  nothing to commit, working tree clean')
+    else:
+        commit_id = repo.create_commit('HEAD', sig, sig, msg, tree, parents)
+        print(f'  Committed {str(commit_id)[:7]}')
 
     print('\n=== Step 7: Confirmation ===')
-    run('git log --oneline')
-    run('git status')
+    for commit in ([] if repo.head_is_unborn else repo.walk(repo.head.target)):
+        print(f'{str(commit.id)[:7]} {commit.message.splitlines()[0]}')
+    print_status(repo)
     print('\nDone!')
 
 if __name__ == '__main__': main()
@@ -0,0 +1,65 @@
+"""Tests for the shared scraper helpers in scripts/_nevo_common.py."""
+
+import sys
+from pathlib import Path
+
+import pytest
+import requests
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+
+import _nevo_common  # noqa: E402
+from _nevo_common import extract_text_from_html, response_charset  # noqa: E402
+
+# No <meta charset>: only the HTTP header says how the body is encoded
+PAGE_WITHOUT_META = "<html><body><p>שלום עולם</p></body></html>"
+
+
+def make_response(content_type):
+    resp = requests.Response()
+    resp.headers["Content-Type"] = content_type
+    return resp
+
+
+@pytest.fixture(params=[True, False], ids=["lxml", "bs4"])
+def parser_path(request, monkeypatch):
+    if request.param and not _nevo_common.HAS_LXML:
+        pytest.skip("lxml not installed")
+    if not request.param and not _nevo_common.HAS_BS4:
+        pytest.skip("beautifulsoup4 not installed")
+    monkeypatch.setattr(_nevo_common, "HAS_LXML", request.param)
+
+
+@pytest.mark.parametrize("encoding", ["utf-8", "windows-1255"])
+def test_header_charset_decodes_page_without_meta(parser_path, encoding):
+    body = PAGE_WITHOUT_META.encode(encoding)
+    assert extract_text_from_html(body, encoding) == "שלום עולם"
+
+
+def test_meta_charset_used_without_header(parser_path):
+    page = '<html><head><meta charset="windows-1255"></head><body><p>שלום</p></body></html>'
+    assert extract_text_from_html(page.encode("cp1255")) == "שלום"
+
+
+def test_utf8_default_without_header_or_meta(parser_path):
+    assert extract_text_from_html(PAGE_WITHOUT_META.encode("utf-8")) == "שלום עולם"
+
+
+def test_bom_without_header_or_meta(parser_path):
+    body = b"\xef\xbb\xbf" + PAGE_WITHOUT_META.encode("utf-8")
+    assert extract_text_from_html(body) == "שלום עולם"
+
+
+def test_str_input_ignores_encoding(parser_path):
+    assert extract_text_from_html(PAGE_WITHOUT_META, "windows-1255") == "שלום עולם"
+
+
+@pytest.mark.parametrize("content_type, expected", [
+    ("text/html; charset=windows-1255", "windows-1255"),
+    ("text/html; charset=UTF-8", "UTF-8"),
+    ("text/html", None),
+    ("application/pdf", None),
+    ("text/html; charset=no-such-codec", None),
+])
+def test_response_charset(content_type, expected):
+    assert response_charset(make_response(content_type)) == expected